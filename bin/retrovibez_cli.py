@@ -6,19 +6,46 @@ Runs reversal detection, figure generation, and report rendering.
 
 import sys
 import os
-import re
+import functools
 from pathlib import Path
 from datetime import datetime
 
-# Add core module path (parent of bin/)
 PIPELINE_ROOT = Path(__file__).parent.parent
-sys.path.insert(0, str(PIPELINE_ROOT))
+_REQ_FILE = str(PIPELINE_ROOT / 'requirements.txt')
 
-from core.systemfairy import run_systemfairy, ensure_requirements
-from core.matlab_runner import run_matlab_analysis
-from core.figure_generator import generate_all_figures
-from core.qmd_generator import generate_qmd_report
-from core.report_renderer import render_report
+# Track files are named track<N>.mat; numbers are sliced out of the name
+_TRACK_PREFIX = 'track'
+_TRACK_SUFFIX = '.mat'
+_PFX_LEN = len(_TRACK_PREFIX)
+_SFX_LEN = len(_TRACK_SUFFIX)
+
+# Track files live in a '*tracks' directory next to the experiment .mat
+_TRACKS_DIR_SUFFIX = 'tracks'
+
+
+def _use_checkout():
+    """
+    Make the checkout's core package importable.
+    
+    The pipeline modules, MATLAB script and templates are loaded from the
+    checkout this file lives in (launcher runs and pip install -e .); a
+    regular pip install copies only this file, so raise ImportError then.
+    """
+    root = str(PIPELINE_ROOT)
+    if root in sys.path:
+        return
+    if not (PIPELINE_ROOT / 'core' / '__init__.py').is_file():
+        raise ImportError(
+            f"RetroVibez checkout not found at {PIPELINE_ROOT}. "
+            "Run bin/retrovibez_cli.py from a checkout, or install it with "
+            "'pip install -e .' from the checkout directory."
+        )
+    sys.path.insert(0, root)
+
+
+def _print_lines(*lines):
+    """Write a block of lines to stdout with a single print call."""
+    print("\n".join(lines))
 
 
 def parse_track_selection(track_input: str, available_tracks: list = None) -> list:
@@ -30,6 +57,9 @@ def parse_track_selection(track_input: str, available_tracks: list = None) -> li
         - '1,2,5' -> [1, 2, 5]
         - '1-10' -> [1, 2, 3, ..., 10]
         - '1,3,5-10,15' -> [1, 3, 5, 6, 7, 8, 9, 10, 15]
+    
+    Each comma-separated token must match in full; malformed tokens such as
+    '1-2abc' or '1-2-3' are ignored rather than partially parsed.
     """
     track_input = track_input.strip().lower()
     
@@ -40,24 +70,57 @@ def parse_track_selection(track_input: str, available_tracks: list = None) -> li
     parts = track_input.replace(' ', '').split(',')
     
     for part in parts:
-        if '-' in part:
+        start, sep, end = part.partition('-')
+        if sep:
             # Range: 1-10
-            match = re.match(r'(\d+)-(\d+)', part)
-            if match:
-                start, end = int(match.group(1)), int(match.group(2))
-                tracks.update(range(start, end + 1))
-        else:
+            if start.isdecimal() and end.isdecimal():
+                tracks.update(range(int(start), int(end) + 1))
+        elif part.isdecimal():
             # Single number
-            if part.isdigit():
-                tracks.add(int(part))
-    
-    result = sorted(list(tracks))
+            tracks.add(int(part))
     
     # Filter to available tracks if provided
     if available_tracks:
-        result = [t for t in result if t in available_tracks]
+        tracks &= frozenset(available_tracks)
     
-    return result
+    return sorted(tracks)
+
+
+def _find_tracks_dir(parent, prefix_sep: str = '') -> str:
+    """
+    Return the first '*tracks' subdirectory of parent, or None.
+    
+    With prefix_sep='_' this matches '*_*tracks' using plain string checks
+    and stops at the first hit. Names are compared via os.path.normcase, so
+    matching is case-insensitive on Windows like glob and MATLAB's dir().
+    """
+    with os.scandir(parent) as it:
+        for entry in it:
+            name = os.path.normcase(entry.name)
+            if (name.endswith(_TRACKS_DIR_SUFFIX)
+                    and prefix_sep in name[:-len(_TRACKS_DIR_SUFFIX)]
+                    and entry.is_dir()):
+                return entry.path
+    return None
+
+
+@functools.lru_cache(maxsize=32)
+def _scan_tracks(tracks_dir: str, dir_mtime: float) -> tuple:
+    """Scan tracks_dir for track*.mat files (cached per directory mtime)."""
+    nums = [
+        int(name[_PFX_LEN:-_SFX_LEN])
+        for name in map(os.path.normcase, os.listdir(tracks_dir))
+        if name.startswith(_TRACK_PREFIX) and name.endswith(_TRACK_SUFFIX)
+        and name[_PFX_LEN:-_SFX_LEN].isdecimal()
+    ]
+    nums.sort()
+    return tuple(nums)
+
+
+def _list_tracks(tracks_dir) -> list:
+    """List track numbers from the track*.mat files in tracks_dir."""
+    tracks_dir = str(tracks_dir)
+    return list(_scan_tracks(tracks_dir, os.stat(tracks_dir).st_mtime))
 
 
 def detect_data_type(path: Path):
@@ -76,14 +139,8 @@ def detect_data_type(path: Path):
     # Check if it's a .mat file (single experiment)
     if path.is_file() and path.suffix == '.mat':
         # Look for tracks directory
-        tracks_pattern = path.parent.glob('*_*tracks')
-        tracks_dir = next(tracks_pattern, None)
-        available_tracks = []
-        if tracks_dir:
-            available_tracks = sorted([
-                int(f.stem.replace('track', ''))
-                for f in tracks_dir.glob('track*.mat')
-            ])
+        tracks_dir = _find_tracks_dir(path.parent, prefix_sep='_')
+        available_tracks = _list_tracks(tracks_dir) if tracks_dir else []
         return 'experiment', path, available_tracks
     
     # It's a directory
@@ -95,20 +152,20 @@ def detect_data_type(path: Path):
             mat_files = list(matfiles.glob('*.mat'))
             if mat_files:
                 # Single eset - look for tracks
-                tracks_dirs = list(matfiles.glob('*tracks'))
-                if tracks_dirs:
-                    tracks_dir = tracks_dirs[0]
-                    available_tracks = sorted([
-                        int(f.stem.replace('track', ''))
-                        for f in tracks_dir.glob('track*.mat')
-                    ])
-                    return 'eset', path, available_tracks
+                tracks_dir = _find_tracks_dir(matfiles)
+                if tracks_dir:
+                    return 'eset', path, _list_tracks(tracks_dir)
                 return 'eset', path, []
         
         # Check for multiple eset directories (collection)
-        eset_dirs = [d for d in path.iterdir() if d.is_dir() and (d / 'matfiles').exists()]
-        if len(eset_dirs) > 1:
-            return 'collection', path, []
+        # (stop scanning as soon as a second eset is found)
+        eset_count = 0
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir() and os.path.isdir(os.path.join(entry.path, 'matfiles')):
+                    eset_count += 1
+                    if eset_count > 1:
+                        return 'collection', path, []
         
         # Check if this is a matfiles directory directly
         if path.name == 'matfiles':
@@ -119,30 +176,83 @@ def detect_data_type(path: Path):
 
 def discover_available_tracks(experiment_path: Path) -> list:
     """Find all available tracks for an experiment."""
-    parent = experiment_path.parent if experiment_path.is_file() else experiment_path / 'matfiles'
-    tracks_dirs = list(parent.glob('*tracks'))
+    experiment_path = os.fspath(experiment_path)
+    if os.path.isfile(experiment_path):
+        parent = os.path.dirname(experiment_path)
+    else:
+        parent = os.path.join(experiment_path, 'matfiles')
     
-    if not tracks_dirs:
+    if not os.path.isdir(parent):
         return []
     
-    tracks_dir = tracks_dirs[0]
-    return sorted([
-        int(f.stem.replace('track', ''))
-        for f in tracks_dir.glob('track*.mat')
-    ])
+    tracks_dir = _find_tracks_dir(parent)
+    
+    if not tracks_dir:
+        return []
+    
+    return _list_tracks(tracks_dir)
+
+
+def _prompt(label: str, default: str = '') -> str:
+    """Read one line of input, stripping whitespace and drag-and-drop quotes."""
+    value = input(f"  {label}: ").strip().strip('"').strip("'")
+    return value or default
+
+
+def _select_tracks(track_input: str, available_tracks: list):
+    """
+    Parse a track selection, falling back when nothing valid is selected.
+    
+    Returns the selected tracks, all available tracks if the selection
+    matched none of them, or None to let MATLAB process whatever exists.
+    """
+    selected_tracks = parse_track_selection(track_input, available_tracks)
+    
+    if not selected_tracks and available_tracks:
+        print("\nNo valid tracks selected. Using all available tracks.")
+        selected_tracks = available_tracks
+    elif not selected_tracks:
+        print("\nNo tracks found. Will process whatever is available.")
+        selected_tracks = None  # Let MATLAB figure it out
+    
+    return selected_tracks
+
+
+def _default_output_dir(detected_path: Path) -> Path:
+    """Timestamped results directory next to the input data."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return detected_path.parent / f"mason_results_{timestamp}"
+
+
+def _print_config_summary(data_type, detected_path, selected_tracks, output_dir):
+    """Print the configuration block shown before the pipeline starts."""
+    _print_lines(
+        "",
+        "=" * 60,
+        "  Configuration Summary",
+        "=" * 60,
+        f"  Data type: {data_type}",
+        f"  Input: {detected_path}",
+        f"  Tracks: {len(selected_tracks) if selected_tracks else 'all'}",
+        f"  Output: {output_dir}",
+        "=" * 60,
+        "",
+    )
 
 
 def get_user_input():
     """Interactive prompts for path and track selection."""
-    print("=" * 60)
-    print("  Mason Reversal Analysis Pipeline")
-    print("=" * 60)
-    print()
-    print("Drag a folder/file into this terminal and press Enter,")
-    print("or type a path:")
-    print()
+    _print_lines(
+        "=" * 60,
+        "  Mason Reversal Analysis Pipeline",
+        "=" * 60,
+        "",
+        "Drag a folder/file into this terminal and press Enter,",
+        "or type a path:",
+        "",
+    )
     
-    user_path = input("  Path: ").strip().strip('"').strip("'")
+    user_path = _prompt("Path")
     
     if not user_path:
         print("\nNo path provided. Exiting.")
@@ -157,60 +267,45 @@ def get_user_input():
     # Auto-detect data type
     data_type, detected_path, available_tracks = detect_data_type(path)
     
-    print()
-    print(f"Detected: {data_type}")
-    print(f"Path: {detected_path}")
-    
+    detected_lines = [
+        "",
+        f"Detected: {data_type}",
+        f"Path: {detected_path}",
+    ]
     if available_tracks:
-        print(f"Available tracks: {len(available_tracks)} ({min(available_tracks)}-{max(available_tracks)})")
+        detected_lines.append(
+            f"Available tracks: {len(available_tracks)} ({min(available_tracks)}-{max(available_tracks)})"
+        )
     
     # Track selection
-    print()
-    print("-" * 40)
-    print("Track Selection Syntax:")
-    print("  all       - All available tracks")
-    print("  1,2,5     - Tracks 1, 2, and 5")
-    print("  1-10      - Tracks 1 through 10")
-    print("  1,3,5-10  - Tracks 1, 3, and 5-10")
-    print("-" * 40)
-    print()
-    
-    track_input = input("  Select tracks [all]: ").strip()
-    
-    if not track_input:
-        track_input = 'all'
-    
-    selected_tracks = parse_track_selection(track_input, available_tracks)
+    _print_lines(
+        *detected_lines,
+        "",
+        "-" * 40,
+        "Track Selection Syntax:",
+        "  all       - All available tracks",
+        "  1,2,5     - Tracks 1, 2, and 5",
+        "  1-10      - Tracks 1 through 10",
+        "  1,3,5-10  - Tracks 1, 3, and 5-10",
+        "-" * 40,
+        "",
+    )
     
-    if not selected_tracks and available_tracks:
-        print("\nNo valid tracks selected. Using all available tracks.")
-        selected_tracks = available_tracks
-    elif not selected_tracks:
-        print("\nNo tracks found. Will process whatever is available.")
-        selected_tracks = None  # Let MATLAB figure it out
+    track_input = _prompt("Select tracks [all]", default='all')
     
-    print()
-    print(f"Selected tracks: {selected_tracks if selected_tracks else 'all available'}")
+    selected_tracks = _select_tracks(track_input, available_tracks)
     
     # Output directory
-    print()
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    default_output = detected_path.parent / f"mason_results_{timestamp}"
-    
-    output_input = input(f"  Output directory [{default_output}]: ").strip().strip('"').strip("'")
+    _print_lines(
+        "",
+        f"Selected tracks: {selected_tracks if selected_tracks else 'all available'}",
+        "",
+    )
+    output_input = _prompt(f"Output directory [{detected_path.parent / 'mason_results_<timestamp>'}]")
     
-    output_dir = Path(output_input) if output_input else default_output
+    output_dir = Path(output_input) if output_input else _default_output_dir(detected_path)
     
-    print()
-    print("=" * 60)
-    print("  Configuration Summary")
-    print("=" * 60)
-    print(f"  Data type: {data_type}")
-    print(f"  Input: {detected_path}")
-    print(f"  Tracks: {len(selected_tracks) if selected_tracks else 'all'}")
-    print(f"  Output: {output_dir}")
-    print("=" * 60)
-    print()
+    _print_config_summary(data_type, detected_path, selected_tracks, output_dir)
     
     confirm = input("Proceed? [Y/n]: ").strip().lower()
     if confirm and confirm not in ('y', 'yes', ''):
@@ -220,8 +315,58 @@ def get_user_input():
     return detected_path, selected_tracks, output_dir
 
 
+def get_batch_input(user_path: str, track_input: str = 'all', output: str = None):
+    """
+    Resolve --input/--tracks/--output flags without prompting.
+    
+    Returns the same (input_path, tracks, output_dir) tuple as
+    get_user_input, or (None, None, None) if the input path is invalid,
+    is not a single experiment or eset, or an explicit --tracks selection
+    matches no tracks. There is no confirmation prompt, so nothing falls
+    back to running every track.
+    """
+    path = Path(user_path)
+    
+    if not path.exists():
+        print(f"Path does not exist: {path}")
+        return None, None, None
+    
+    data_type, detected_path, available_tracks = detect_data_type(path)
+    
+    if data_type not in ('experiment', 'eset'):
+        print(f"Unsupported input ({data_type}): {detected_path}")
+        print("Pass an experiment .mat file or a single eset directory.")
+        return None, None, None
+    
+    if track_input.strip().lower() == 'all':
+        selected_tracks = _select_tracks(track_input, available_tracks)
+    else:
+        selected_tracks = parse_track_selection(track_input, available_tracks)
+        if not selected_tracks:
+            print(f"No tracks match --tracks {track_input!r}.")
+            return None, None, None
+    
+    output_dir = Path(output) if output else _default_output_dir(detected_path)
+    
+    _print_config_summary(data_type, detected_path, selected_tracks, output_dir)
+    
+    return detected_path, selected_tracks, output_dir
+
+
 def run_pipeline(input_path: Path, tracks: list, output_dir: Path):
     """Execute the full analysis pipeline."""
+    _use_checkout()
+    
+    # Imported here so check/install/help don't load numpy/matplotlib/h5py
+    # or multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from contextlib import ExitStack
+    from core.matlab_runner import run_matlab_analysis
+    from core.figure_generator import (
+        generate_figures_for_track, collect_figure_results, figure_workers, list_result_tracks
+    )
+    from core.qmd_generator import generate_qmd_report
+    from core.report_renderer import render_report
     
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -231,65 +376,159 @@ def run_pipeline(input_path: Path, tracks: list, output_dir: Path):
     results_dir.mkdir(exist_ok=True)
     figures_dir.mkdir(exist_ok=True)
     
-    print()
-    print("=" * 60)
-    print("  Step 1/4: MATLAB Analysis")
-    print("=" * 60)
-    
-    success = run_matlab_analysis(
-        input_path=input_path,
-        tracks=tracks,
-        output_dir=results_dir
+    _print_lines(
+        "",
+        "=" * 60,
+        "  Step 1/4: MATLAB Analysis",
+        "=" * 60,
     )
     
-    if not success:
-        print("\nMATLAB analysis failed. Aborting.")
-        return False
-    
-    print()
-    print("=" * 60)
-    print("  Step 2/4: Figure Generation")
-    print("=" * 60)
+    # One MATLAB worker per track, capped at the CPU count
+    num_workers = min(len(tracks), os.cpu_count() or 1) if tracks else (os.cpu_count() or 1)
+    
+    # Figures for each track are rendered in the background as soon as
+    # MATLAB has written that track's results. The streaming pool is created
+    # on the first finished track, by which point MATLAB has reported its
+    # real pool size, and only uses the cores MATLAB leaves free.
+    matlab_workers = num_workers
+    stream_executor = None
+    futures = {}
+    
+    def set_matlab_workers(count):
+        nonlocal matlab_workers
+        matlab_workers = count
+    
+    with ExitStack() as stack:
+        def submit_figures(track_num):
+            nonlocal stream_executor
+            if stream_executor is None:
+                stream_executor = stack.enter_context(ProcessPoolExecutor(
+                    max_workers=figure_workers(len(tracks) if tracks else None,
+                                               reserved=max(1, matlab_workers))
+                ))
+            future = stream_executor.submit(generate_figures_for_track, track_num, results_dir, figures_dir)
+            futures[future] = track_num
+        
+        success = run_matlab_analysis(
+            input_path=input_path,
+            tracks=tracks,
+            output_dir=results_dir,
+            on_track_done=submit_figures,
+            num_workers=num_workers,
+            on_pool_ready=set_matlab_workers
+        )
+        
+        if not success:
+            for future in futures:
+                future.cancel()
+            print("\nMATLAB analysis failed. Aborting.")
+            return False
+        
+        _print_lines(
+            "",
+            "=" * 60,
+            "  Step 2/4: Figure Generation",
+            "=" * 60,
+        )
+        
+        # MATLAB has exited, so the cores it used are free again: pull back
+        # figure jobs that have not started yet and render them, together
+        # with tracks that were not reported while streaming (every selected
+        # track, failed ones being recorded as not_found, or every track
+        # directory MATLAB wrote when processing all tracks), on a pool
+        # sized to the full core count.
+        for future in [f for f in futures if f.cancel()]:
+            del futures[future]
+        active = set(futures.values())
+        remaining = [
+            t for t in (tracks or list_result_tracks(results_dir))
+            if t not in active
+        ]
+        catchup_executor = stack.enter_context(
+            ProcessPoolExecutor(max_workers=figure_workers(len(remaining)))
+        )
+        for track_num in remaining:
+            future = catchup_executor.submit(generate_figures_for_track, track_num, results_dir, figures_dir)
+            futures[future] = track_num
+        
+        if futures:
+            print(f"Generating figures for {len(futures)} tracks...")
+            collect_figure_results(futures, figures_dir)
+        else:
+            print("No tracks to process.")
     
-    generate_all_figures(
-        results_dir=results_dir,
-        figures_dir=figures_dir,
-        tracks=tracks
+    _print_lines(
+        "",
+        "=" * 60,
+        "  Step 3/4: QMD Report Generation",
+        "=" * 60,
     )
     
-    print()
-    print("=" * 60)
-    print("  Step 3/4: QMD Report Generation")
-    print("=" * 60)
-    
     qmd_path = generate_qmd_report(
         results_dir=results_dir,
         figures_dir=figures_dir,
         output_dir=output_dir
     )
     
-    print()
-    print("=" * 60)
-    print("  Step 4/4: Rendering PDF/HTML")
-    print("=" * 60)
+    _print_lines(
+        "",
+        "=" * 60,
+        "  Step 4/4: Rendering PDF/HTML",
+        "=" * 60,
+    )
     
     render_report(qmd_path)
     
-    print()
-    print("=" * 60)
-    print("  Pipeline Complete!")
-    print("=" * 60)
-    print()
-    print(f"  Results:  {results_dir}")
-    print(f"  Figures:  {figures_dir}")
-    print(f"  Report:   {qmd_path.stem}.pdf / .html")
-    print()
+    _print_lines(
+        "",
+        "=" * 60,
+        "  Pipeline Complete!",
+        "=" * 60,
+        "",
+        f"  Results:  {results_dir}",
+        f"  Figures:  {figures_dir}",
+        f"  Report:   {qmd_path.stem}.pdf / .html",
+        "",
+    )
     
     return True
 
 
+def parse_args(argv: list):
+    """
+    Parse non-interactive flags.
+    
+    Without --input, other arguments are left for main()'s subcommands;
+    with --input, any unrecognised argument (e.g. a mistyped flag) is an
+    error rather than being silently ignored. --tracks and --output are
+    only valid together with --input.
+    """
+    import argparse
+    
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--input', help='Experiment .mat file or eset directory')
+    parser.add_argument('--tracks', help="Track selection, e.g. 'all' or '1,3,5-10' (default: all)")
+    parser.add_argument('--output', help='Output directory (default: timestamped next to input)')
+    args, extra = parser.parse_known_args(argv)
+    if args.input and extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    if not args.input and (args.tracks is not None or args.output is not None):
+        parser.error("--tracks and --output require --input")
+    if args.tracks is None:
+        args.tracks = 'all'
+    return args
+
+
 def main():
     """Main entry point."""
+    try:
+        _use_checkout()
+    except ImportError as e:
+        print(f"ERROR: {e}")
+        return 1
+    
+    from core.systemfairy import run_systemfairy
+    
     # Check for special commands
     if len(sys.argv) > 1:
         cmd = sys.argv[1].lower()
@@ -302,19 +541,27 @@ def main():
             print_help()
             return 0
     
+    args = parse_args(sys.argv[1:])
+    
     try:
         # Run environment check first
         print()
         ok, missing = run_systemfairy(verbose=True)
         
-        if not ok:
+        if not ok and args.input:
+            print("\nEnvironment check failed. Aborting.")
+            return 1
+        elif not ok:
             print()
             response = input("Continue anyway? [y/N]: ").strip().lower()
             if response not in ('y', 'yes'):
                 return 1
         
         print()
-        input_path, tracks, output_dir = get_user_input()
+        if args.input:
+            input_path, tracks, output_dir = get_batch_input(args.input, args.tracks, args.output)
+        else:
+            input_path, tracks, output_dir = get_user_input()
         
         if input_path is None:
             return 1
@@ -337,10 +584,9 @@ def install_dependencies():
     import subprocess
     
     print("Installing Python dependencies...")
-    req_file = PIPELINE_ROOT / 'requirements.txt'
     
     result = subprocess.run(
-        [sys.executable, '-m', 'pip', 'install', '-r', str(req_file)],
+        [sys.executable, '-m', 'pip', 'install', '-r', _REQ_FILE],
         capture_output=False
     )
     
@@ -364,6 +610,11 @@ Usage:
   python mason_cli.py install      Install Python dependencies
   python mason_cli.py help         Show this help
 
+Non-interactive:
+  python mason_cli.py --input PATH [--tracks SEL] [--output DIR]
+      Run without prompts (tracks default to 'all', output to a
+      timestamped directory next to the input)
+
 Or double-click: mason_analysis.bat
 
 Track Selection Syntax:
@@ -12,6 +12,7 @@ matplotlib.use('Agg')  # Non-interactive backend
 import matplotlib.pyplot as plt
 from matplotlib.colors import LinearSegmentedColormap
 import h5py
+import os
 import json
 from pathlib import Path
 from concurrent.futures import ProcessPoolExecutor, as_completed
@@ -57,6 +58,14 @@ def load_track_data(track_dir):
     return data
 
 
+def figure_workers(num_tracks: int = None, reserved: int = 0) -> int:
+    """Worker process count for figure generation (one per free core, at most one per track)"""
+    workers = max(1, (os.cpu_count() or 1) - reserved)
+    if num_tracks:
+        workers = min(workers, num_tracks)
+    return workers
+
+
 def create_speed_colormap():
     """Create black-to-white heat colormap for speed visualization"""
     colors = [
@@ -217,9 +226,8 @@ def plot_reversal_closeup(track_data, reversal_idx, output_path):
     plt.close()
 
 
-def process_single_track(args):
-    """Process a single track - called by parallel executor"""
-    track_num, results_dir, figures_dir = args
+def generate_figures_for_track(track_num, results_dir, figures_dir):
+    """Generate all figures for a single track - safe to run in a worker process"""
     track_dir = Path(results_dir) / f'track{track_num}'
     
     if not track_dir.exists():
@@ -247,6 +255,54 @@ def process_single_track(args):
         return {'track_num': track_num, 'status': 'error', 'error': str(e), 'reversals': 0}
 
 
+def collect_figure_results(futures: dict, figures_dir: Path) -> list:
+    """
+    Wait for submitted figure jobs and write the figure summary.
+    
+    Args:
+        futures: Mapping of Future -> track number
+        figures_dir: Directory where summary.json is written
+    
+    Returns:
+        List of per-track result dicts
+    """
+    results = []
+    for future in as_completed(futures):
+        track_num = futures[future]
+        try:
+            result = future.result()
+            results.append(result)
+            status = result['status']
+            revs = result['reversals']
+            print(f"  Track {track_num}: {status} ({revs} reversals)")
+        except Exception as e:
+            print(f"  Track {track_num}: exception - {e}")
+            results.append({'track_num': track_num, 'status': 'exception', 'reversals': 0})
+    
+    results.sort(key=lambda r: r['track_num'])
+    
+    # Summary
+    success = sum(1 for r in results if r['status'] == 'success')
+    total_revs = sum(r['reversals'] for r in results)
+    print(f"\nFigure generation complete: {success}/{len(futures)} tracks, {total_revs} total reversals")
+    
+    # Save summary
+    with open(Path(figures_dir) / 'summary.json', 'w') as f:
+        json.dump({'tracks': results, 'total_reversals': total_revs}, f, indent=2)
+    
+    return results
+
+
+def list_result_tracks(results_dir: Path) -> list:
+    """List track numbers that have a track<N> results directory"""
+    with os.scandir(results_dir) as it:
+        return sorted(
+            int(entry.name[5:])
+            for entry in it
+            if entry.name.startswith('track') and entry.name[5:].isdecimal() and entry.is_dir()
+        )
+
+
 def generate_all_figures(results_dir: Path, figures_dir: Path, tracks: list = None):
     """
     Generate all figures for processed tracks.
@@ -262,12 +318,7 @@ def generate_all_figures(results_dir: Path, figures_dir: Path, tracks: list = No
     
     # Auto-detect tracks if not specified
     if tracks is None:
-        track_dirs = sorted([
-            int(d.name.replace('track', ''))
-            for d in results_dir.iterdir()
-            if d.is_dir() and d.name.startswith('track')
-        ])
-        tracks = track_dirs
+        tracks = list_result_tracks(results_dir)
     
     if not tracks:
         print("No tracks to process.")
@@ -275,32 +326,9 @@ def generate_all_figures(results_dir: Path, figures_dir: Path, tracks: list = No
     
     print(f"Generating figures for {len(tracks)} tracks...")
     
-    # Prepare args for parallel processing
-    args_list = [(t, results_dir, figures_dir) for t in tracks]
-    
-    results = []
-    max_workers = min(4, len(tracks))
-    
-    with ProcessPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(process_single_track, args): args[0] for args in args_list}
-        for future in as_completed(futures):
-            track_num = futures[future]
-            try:
-                result = future.result()
-                results.append(result)
-                status = result['status']
-                revs = result['reversals']
-                print(f"  Track {track_num}: {status} ({revs} reversals)")
-            except Exception as e:
-                print(f"  Track {track_num}: exception - {e}")
-                results.append({'track_num': track_num, 'status': 'exception', 'reversals': 0})
-    
-    # Summary
-    success = sum(1 for r in results if r['status'] == 'success')
-    total_revs = sum(r['reversals'] for r in results)
-    print(f"\nFigure generation complete: {success}/{len(tracks)} tracks, {total_revs} total reversals")
-    
-    # Save summary
-    with open(figures_dir / 'summary.json', 'w') as f:
-        json.dump({'tracks': results, 'total_reversals': total_revs}, f, indent=2)
-
+    with ProcessPoolExecutor(max_workers=figure_workers(len(tracks))) as executor:
+        futures = {
+            executor.submit(generate_figures_for_track, t, results_dir, figures_dir): t
+            for t in tracks
+        }
+        collect_figure_results(futures, figures_dir)
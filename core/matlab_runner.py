@@ -4,18 +4,46 @@ MATLAB Runner - Executes MATLAB headless for Mason analysis.
 
 import subprocess
 import sys
+import os
+import re
 import json
+import threading
 from pathlib import Path
 
 
-def run_matlab_analysis(input_path: Path, tracks: list, output_dir: Path) -> bool:
+MATLAB_TIMEOUT = 3600  # 1 hour
+
+# MATLAB progress line printed once a track's results are on disk
+_TRACK_DONE_RE = re.compile(r'Track (\d+) reversals found:')
+
+# MATLAB lines reporting the worker pool it actually opened
+_POOL_RE = re.compile(r'Using (\d+) parallel workers')
+_SERIAL_LINE = 'Processing tracks serially'
+
+
+def run_matlab_analysis(input_path: Path, tracks: list, output_dir: Path,
+                        on_track_done=None, num_workers: int = None,
+                        on_pool_ready=None) -> bool:
     """
     Run MATLAB headless to compute reversal detection.
     
+    MATLAB output is streamed as it runs. If on_track_done is given, it is
+    called with each track number as soon as that track's track_data.h5
+    has been written, so downstream work can start before MATLAB exits.
+    
+    num_workers is forwarded to MATLAB as MASON_NWORKERS; when it is above 1
+    and the Parallel Computing Toolbox is available, tracks are processed
+    on a local parpool of that size (clamped by MATLAB to the cluster
+    profile); on_pool_ready, if given, is called with the pool size MATLAB
+    actually opened (0 = serial) before any track finishes.
+    
     Args:
         input_path: Path to experiment .mat file or eset directory
         tracks: List of track numbers to process (None = all)
         output_dir: Directory to save results
+        on_track_done: Optional callback taking a finished track number
+        num_workers: MATLAB parpool size (None or 1 = serial)
+        on_pool_ready: Optional callback taking MATLAB's actual worker count
     
     Returns:
         True if successful, False otherwise
@@ -67,28 +95,59 @@ def run_matlab_analysis(input_path: Path, tracks: list, output_dir: Path) -> boo
     print(f"  Experiment: {expt_path}")
     print(f"  Tracks: {track_str}")
     print(f"  Output: {output_dir}")
+    if num_workers and num_workers > 1:
+        print(f"  Workers: {num_workers}")
     print()
     
+    env = os.environ.copy()
+    if num_workers:
+        env['MASON_NWORKERS'] = str(num_workers)
+    
     try:
-        # Run MATLAB headless
-        result = subprocess.run(
+        # Run MATLAB headless, streaming its output
+        proc = subprocess.Popen(
             ['matlab', '-batch', matlab_full_cmd],
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
             text=True,
-            timeout=3600  # 1 hour timeout
+            env=env
         )
+        timed_out = threading.Event()
         
-        if result.returncode != 0:
-            print("MATLAB Error Output:")
-            print(result.stderr)
-            print(result.stdout)
-            return False
+        def kill_on_timeout():
+            timed_out.set()
+            proc.kill()
         
-        # Print MATLAB output
-        if result.stdout:
-            for line in result.stdout.split('\n'):
+        timer = threading.Timer(MATLAB_TIMEOUT, kill_on_timeout)
+        timer.start()
+        try:
+            for line in proc.stdout:
+                line = line.rstrip()
                 if line.strip():
                     print(f"  {line}")
+                match = _TRACK_DONE_RE.search(line)
+                if match and on_track_done:
+                    on_track_done(int(match.group(1)))
+                elif on_pool_ready:
+                    pool_match = _POOL_RE.search(line)
+                    if pool_match:
+                        on_pool_ready(int(pool_match.group(1)))
+                    elif line.strip() == _SERIAL_LINE:
+                        on_pool_ready(0)
+            proc.wait()
+        finally:
+            timer.cancel()
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+        
+        if timed_out.is_set():
+            print("ERROR: MATLAB analysis timed out (>1 hour)")
+            return False
+        
+        if proc.returncode != 0:
+            print(f"MATLAB exited with code {proc.returncode}")
+            return False
         
         # Check for success indicator
         summary_file = output_dir / 'analysis_summary.json'
@@ -98,6 +157,8 @@ def run_matlab_analysis(input_path: Path, tracks: list, output_dir: Path) -> boo
             print()
             print(f"Analysis complete:")
             print(f"  Total tracks: {summary.get('total_tracks', 0)}")
+            if 'parallel_workers' in summary:
+                print(f"  MATLAB workers: {summary['parallel_workers'] or 'serial'}")
             print(f"  Tracks with reversals: {summary.get('tracks_with_reversals', 0)}")
             print(f"  Total reversals: {summary.get('total_reversals', 0)}")
             return True
@@ -106,9 +167,6 @@ def run_matlab_analysis(input_path: Path, tracks: list, output_dir: Path) -> boo
             # Still return True if output directory has content
             return any(output_dir.iterdir())
         
-    except subprocess.TimeoutExpired:
-        print("ERROR: MATLAB analysis timed out (>1 hour)")
-        return False
     except FileNotFoundError:
         print("ERROR: MATLAB not found. Make sure MATLAB is installed and in PATH.")
         return False
@@ -43,6 +43,9 @@ def generate_qmd_report(results_dir: Path, figures_dir: Path, output_dir: Path)
     experiment_name = summary.get('experiment', 'Unknown')
     timestamp = summary.get('timestamp', datetime.now().strftime("%Y%m%d%H%M%S"))
     
+    # Index per-track figure results by track number
+    track_infos = {t.get('track_num'): t for t in fig_summary.get('tracks', [])}
+    
     # Find all track directories with figures
     track_dirs = sorted([
         d for d in figures_dir.iterdir()
@@ -111,10 +114,7 @@ def generate_qmd_report(results_dir: Path, figures_dir: Path, output_dir: Path)
         qmd_lines.append('')
         
         # Find track info from fig_summary
-        track_info = next(
-            (t for t in fig_summary.get('tracks', []) if t.get('track_num') == track_num),
-            {'reversals': 0}
-        )
+        track_info = track_infos.get(track_num, {'reversals': 0})
         num_reversals = track_info.get('reversals', 0)
         
         qmd_lines.append(f"**Reversals detected:** {num_reversals}")
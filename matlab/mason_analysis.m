@@ -178,11 +178,41 @@ results.tracks_with_reversals = 0;
 results.total_reversals = 0;
 results.reversal_durations = [];
 
-for t = 1:length(tracks)
+%% Open a worker pool if requested (MASON_NWORKERS set by the Python runner)
+max_workers = 0;  % 0 = run the loop below serially in this session
+nworkers = str2double(getenv('MASON_NWORKERS'));
+if ~isnan(nworkers) && nworkers > 1 && length(tracks) > 1 && ...
+        license('test', 'Distrib_Computing_Toolbox')
+    try
+        % Python asks for logical cores; the local profile allows physical
+        % cores only, so clamp before opening the pool
+        cluster = parcluster('local');
+        nworkers = min(nworkers, cluster.NumWorkers);
+        pool = gcp('nocreate');
+        if isempty(pool)
+            pool = parpool(cluster, nworkers);
+        end
+        max_workers = min(nworkers, pool.NumWorkers);
+    catch ME
+        fprintf('Warning: Could not start parallel pool: %s\n', ME.message);
+    end
+end
+if max_workers > 0
+    fprintf('Using %d parallel workers\n', max_workers);
+else
+    fprintf('Processing tracks serially\n');
+end
+results.parallel_workers = max_workers;
+
+num_tracks = length(tracks);
+track_rev_counts = zeros(1, num_tracks);
+track_rev_durations = cell(1, num_tracks);
+
+parfor (t = 1:num_tracks, max_workers)
     track = tracks(t);
     track_num = loaded_track_nums(t);
     
-    fprintf('Processing track %d (%d/%d)...\n', track_num, t, length(tracks));
+    fprintf('Processing track %d (%d/%d)...\n', track_num, t, num_tracks);
     
     try
         % Compute reversal detection
@@ -199,22 +229,24 @@ for t = 1:length(tracks)
         save_track_to_h5(h5_file, track_num, SpeedRunVel, times, xpos, ypos, eti, reversals, ...
                          expt_filename, timestamp, lengthPerPixel);
         
-        % Update summary
+        % Record per-track results (reduced into the summary below)
+        track_rev_counts(t) = length(reversals);
         if ~isempty(reversals)
-            results.tracks_with_reversals = results.tracks_with_reversals + 1;
-            results.total_reversals = results.total_reversals + length(reversals);
-            for r = 1:length(reversals)
-                results.reversal_durations(end+1) = reversals(r).duration;
-            end
+            track_rev_durations{t} = [reversals.duration];
         end
         
-        fprintf('  Reversals found: %d\n', length(reversals));
+        fprintf('  Track %d reversals found: %d\n', track_num, length(reversals));
         
     catch ME
-        fprintf('  ERROR: %s\n', ME.message);
+        fprintf('  Track %d ERROR: %s\n', track_num, ME.message);
     end
 end
 
+% Update summary
+results.tracks_with_reversals = nnz(track_rev_counts);
+results.total_reversals = sum(track_rev_counts);
+results.reversal_durations = [track_rev_durations{:}];
+
 %% Generate Summary Report
 fprintf('\n=== Summary ===\n');
 fprintf('Total tracks processed: %d\n', results.total_tracks);
@@ -236,6 +268,7 @@ fprintf(fid, '  "timestamp": "%s",\n', results.timestamp);
 fprintf(fid, '  "lengthPerPixel": %.6f,\n', lengthPerPixel);
 fprintf(fid, '  "target_tracks": [%s],\n', strjoin(arrayfun(@num2str, loaded_track_nums, 'UniformOutput', false), ', '));
 fprintf(fid, '  "total_tracks": %d,\n', results.total_tracks);
+fprintf(fid, '  "parallel_workers": %d,\n', results.parallel_workers);
 fprintf(fid, '  "tracks_with_reversals": %d,\n', results.tracks_with_reversals);
 fprintf(fid, '  "total_reversals": %d,\n', results.total_reversals);
 if ~isempty(results.reversal_durations)